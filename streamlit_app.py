@@ -5,6 +5,22 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 import re
+from datetime import date, time
+
+# Regex patterns are compiled once at import instead of on every call
+_CUSTOMER_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Customer[:\s]+([^\n\r]+)',
+    r'Name[:\s]+([^\n\r]+)',
+    r'Client[:\s]+([^\n\r]+)',
+))
+
+_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+    r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+))
+
+_SPLIT_RE = re.compile(r'\s{2,}|\t|,')
+_DIGITS_RE = re.compile(r'(\d+)')
 
 def parse_manual_input(text_input):
     """Parse manually entered order information"""
@@ -13,26 +29,15 @@ def parse_manual_input(text_input):
     order_date = "Not specified"
     
     # Try to extract customer name
-    customer_patterns = [
-        r'Customer[:\s]+([^\n\r]+)',
-        r'Name[:\s]+([^\n\r]+)',
-        r'Client[:\s]+([^\n\r]+)',
-    ]
-    
-    for pattern in customer_patterns:
-        match = re.search(pattern, text_input, re.IGNORECASE)
+    for pattern in _CUSTOMER_PATTERNS:
+        match = pattern.search(text_input)
         if match:
             customer_name = match.group(1).strip()
             break
     
     # Try to extract date
-    date_patterns = [
-        r'Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, text_input, re.IGNORECASE)
+    for pattern in _DATE_PATTERNS:
+        match = pattern.search(text_input)
         if match:
             order_date = match.group(1).strip()
             break
@@ -55,7 +60,7 @@ def parse_line_items_from_text(text_input):
         
         # Look for lines that might contain product info
         # Try to split on common separators
-        parts = re.split(r'\s{2,}|\t|,', line)
+        parts = _SPLIT_RE.split(line)
         
         if len(parts) >= 2:
             clean_parts = [part.strip() for part in parts if part.strip()]
@@ -78,18 +83,13 @@ def calculate_summary_from_manual(df):
     total_quantity = 0
     
     if not df.empty and 'Quantity' in df.columns:
-        # Try to sum quantities
-        for qty in df['Quantity']:
-            try:
-                # Extract numbers from quantity field
-                numbers = re.findall(r'\d+', str(qty))
-                if numbers:
-                    total_quantity += int(numbers[0])
-            except:
-                continue
+        # Sum the first number found in each quantity field
+        numbers = df['Quantity'].astype(str).str.extract(_DIGITS_RE, expand=False)
+        total_quantity = int(pd.to_numeric(numbers, errors='coerce').fillna(0).sum())
     
     return total_products, total_quantity if total_quantity > 0 else "Unable to calculate"
 
+@st.cache_data
 def create_sample_data():
     """Create sample data for demonstration"""
     sample_items = [
@@ -99,6 +99,42 @@ def create_sample_data():
     ]
     return pd.DataFrame(sample_items)
 
+def has_temporal_columns(df):
+    """Check whether any column was parsed into dates, times or timestamps"""
+    for _, values in df.items():
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return True
+        if values.dtype == object:
+            first = values.dropna().iloc[:1]
+            if not first.empty and isinstance(first.iloc[0], (date, time)):
+                return True
+    return False
+
+def read_uploaded_csv(uploaded_csv):
+    """Read an uploaded CSV, preferring the pyarrow parser when it is available"""
+    data = uploaded_csv.getvalue()
+    encoding = 'utf-8'
+    if not data.isascii():
+        try:
+            data.decode('utf-8')
+        except UnicodeDecodeError:
+            # Not UTF-8, most likely exported from Excel on Windows
+            encoding = 'latin-1'
+    
+    try:
+        df = pd.read_csv(uploaded_csv, engine='pyarrow', encoding=encoding)
+        # pyarrow turns date and time text into date objects, which would
+        # change how the table and reports show them; the C parser keeps text
+        if not has_temporal_columns(df):
+            return df
+    except Exception:
+        # pyarrow missing or unable to parse this file
+        pass
+    
+    # Fall back to the C parser
+    uploaded_csv.seek(0)
+    return pd.read_csv(uploaded_csv, low_memory=False, encoding=encoding)
+
 def main():
     st.title("📋 Order Processor - Manual Entry Version")
     st.markdown("Process order information through manual text entry or CSV upload")
@@ -173,7 +209,7 @@ Bread          Whole Wheat       2        $8.00""",
         
         if uploaded_csv is not None:
             try:
-                df = pd.read_csv(uploaded_csv)
+                df = read_uploaded_csv(uploaded_csv)
                 st.success(f"✅ CSV uploaded: {uploaded_csv.name}")
                 
                 # Input customer info
@@ -199,6 +235,20 @@ Bread          Whole Wheat       2        $8.00""",
             total_products, total_quantity = calculate_summary_from_manual(sample_df)
             display_results("John Smith", "12/15/2024", total_products, total_quantity, sample_df, "sample_data")
 
+@st.cache_data(max_entries=16)
+def convert_to_csv(df):
+    """Convert a DataFrame to CSV text for the download buttons"""
+    return df.to_csv(index=False)
+
+@st.cache_data(max_entries=16)
+def create_excel_report(summary_df, items_df):
+    """Build the combined Excel report, reusing the bytes for unchanged data"""
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+        summary_df.to_excel(writer, sheet_name='Order_Summary', index=False)
+        items_df.to_excel(writer, sheet_name='Line_Items', index=False)
+    return excel_buffer.getvalue()
+
 def display_results(customer_name, order_date, total_products, total_quantity, items_df, source):
     """Display the processed results"""
     st.divider()
@@ -240,7 +290,7 @@ def display_results(customer_name, order_date, total_products, total_quantity, i
         
         with col1:
             # Download summary as CSV
-            summary_csv = summary_df.to_csv(index=False)
+            summary_csv = convert_to_csv(summary_df)
             st.download_button(
                 label="📊 Download Summary (CSV)",
                 data=summary_csv,
@@ -250,7 +300,7 @@ def display_results(customer_name, order_date, total_products, total_quantity, i
         
         with col2:
             # Download line items as CSV
-            items_csv = items_df.to_csv(index=False)
+            items_csv = convert_to_csv(items_df)
             st.download_button(
                 label="📋 Download Line Items (CSV)",
                 data=items_csv,
@@ -260,14 +310,9 @@ def display_results(customer_name, order_date, total_products, total_quantity, i
         
         with col3:
             # Download combined Excel file
-            excel_buffer = BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                summary_df.to_excel(writer, sheet_name='Order_Summary', index=False)
-                items_df.to_excel(writer, sheet_name='Line_Items', index=False)
-            
             st.download_button(
                 label="📊 Download Complete Report (Excel)",
-                data=excel_buffer.getvalue(),
+                data=create_excel_report(summary_df, items_df),
                 file_name=f"order_report_{source}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
@@ -276,7 +321,7 @@ def display_results(customer_name, order_date, total_products, total_quantity, i
         st.warning("⚠️ No line items found.")
         
         # Still offer summary download
-        summary_csv = summary_df.to_csv(index=False)
+        summary_csv = convert_to_csv(summary_df)
         st.download_button(
             label="📊 Download Summary (CSV)",
             data=summary_csv,
@@ -3,8 +3,6 @@
 
 import streamlit as st
 import pandas as pd
-import tempfile
-import os
 from io import BytesIO
 import re
 from datetime import datetime
@@ -36,56 +34,73 @@ except ImportError as e:
     """)
     st.stop()
 
+# Regex patterns are compiled once at import instead of on every call
+_CUSTOMER_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Customer[:\s]+([^\n\r]+)',
+    r'Bill[ing]*\s+To[:\s]+([^\n\r]+)',
+    r'Ship[ping]*\s+To[:\s]+([^\n\r]+)',
+    r'Name[:\s]+([^\n\r]+)',
+    r'Client[:\s]+([^\n\r]+)',
+    r'Delivery[:\s]+([^\n\r]+)',
+))
+
+_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+    r'Order\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+    r'Invoice\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+    r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+))
+
+# Separators left at the end of an extracted customer name
+_TRAILING_SEPARATOR_RE = re.compile(r'[:\s]+$')
+
+# Column names containing any of these words are treated as quantities
+_QTY_COLUMN_RE = re.compile(r'qty|quantity|units|count|qnty', re.IGNORECASE)
+_NON_NUMERIC_RE = re.compile(r'[^\d.]')
+
+@st.cache_data(show_spinner=False, max_entries=16)
 def extract_customer_info(text):
     """Extract customer information from PDF text"""
     customer_name = "Not found"
     order_date = "Not found"
     
     # Try to find customer name (common patterns)
-    customer_patterns = [
-        r'Customer[:\s]+([^\n\r]+)',
-        r'Bill[ing]*\s+To[:\s]+([^\n\r]+)',
-        r'Ship[ping]*\s+To[:\s]+([^\n\r]+)',
-        r'Name[:\s]+([^\n\r]+)',
-        r'Client[:\s]+([^\n\r]+)',
-        r'Delivery[:\s]+([^\n\r]+)',
-    ]
-    
-    for pattern in customer_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match and customer_name == "Not found":
+    for pattern in _CUSTOMER_PATTERNS:
+        match = pattern.search(text)
+        if match:
             customer_name = match.group(1).strip()
             # Clean up common artifacts
-            customer_name = re.sub(r'[:\s]+$', '', customer_name)
+            customer_name = _TRAILING_SEPARATOR_RE.sub('', customer_name)
             break
     
     # Try to find date (common patterns)
-    date_patterns = [
-        r'Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'Order\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'Invoice\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match and order_date == "Not found":
+    for pattern in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
             order_date = match.group(1).strip()
             break
     
     return customer_name, order_date
 
-def extract_tables_from_pdf(pdf_path):
-    """Extract tables from PDF using pdfplumber"""
+def drop_empty_rows(df):
+    """Remove completely empty rows, skipping the copy when there are none"""
+    if df.isna().all(axis=1).any():
+        return df.dropna(how='all')
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def extract_tables_from_pdf(pdf_bytes, all_pages=True):
+    """Extract tables from PDF bytes using pdfplumber, cached per file content"""
     tables = []
-    all_text = ""
+    page_texts = []
     
-    with pdfplumber.open(pdf_path) as pdf:
+    # Only the first page is loaded when all_pages is off
+    with pdfplumber.open(BytesIO(pdf_bytes), pages=None if all_pages else [1]) as pdf:
         for page_num, page in enumerate(pdf.pages):
             # Extract text for customer info
             page_text = page.extract_text()
             if page_text:
-                all_text += page_text + "\n"
+                page_texts.append(page_text + "\n")
             
             # Extract tables
             page_tables = page.extract_tables()
@@ -96,54 +111,69 @@ def extract_tables_from_pdf(pdf_path):
                     data = table[1:] if len(table) > 1 else []
                     
                     if data:
-                        df = pd.DataFrame(data, columns=headers)
+                        # Arrow-backed strings avoid one Python object per cell
+                        df = pd.DataFrame(data, columns=headers, dtype="string[pyarrow]")
                         # Clean up the dataframe
-                        df = df.dropna(how='all')  # Remove completely empty rows
+                        df = drop_empty_rows(df)
                         df = df.loc[:, ~df.columns.duplicated()]  # Remove duplicate columns
                         
-                        # Add metadata
-                        df['_page'] = page_num + 1
-                        df['_table'] = table_num + 1
-                        
-                        tables.append(df)
+                        # Keep the source alongside the table instead of as extra columns
+                        tables.append((f'Page_{page_num + 1}_Table_{table_num + 1}', df))
     
-    return tables, all_text
+    # Join once at the end rather than growing a string page by page
+    return tables, "".join(page_texts)
+
+def downcast_columns(df):
+    """Shrink integer columns and store repetitive text columns as categories"""
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind in 'iu':
+            downcast = 'unsigned' if values.min() >= 0 else 'integer'
+            converted[col] = pd.to_numeric(values, downcast=downcast)
+        elif pd.api.types.is_string_dtype(values) and values.nunique() < len(values) * 0.5:
+            converted[col] = values.astype('category')
+    return df.assign(**converted)
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def process_line_items(tables):
     """Process and combine line items from all tables"""
     if not tables:
         return pd.DataFrame()
     
-    all_items = []
+    frames = {}
     
-    for i, df in enumerate(tables):
+    for source, df in tables:
         # Skip very small tables (likely headers or footers)
         if len(df) < 2:
             continue
         
         # Clean up the dataframe
-        df_copy = df.copy()
-        df_copy = df_copy.dropna(how='all')  # Remove completely empty rows
-        
-        # Add source information
-        for idx, row in df_copy.iterrows():
-            item_data = {
-                'Table_Source': f'Page_{row.get("_page", "Unknown")}_Table_{row.get("_table", i+1)}',
-                'Row_Index': idx
-            }
-            
-            # Add all columns (except metadata)
-            for col in df_copy.columns:
-                if not col.startswith('_'):
-                    item_data[str(col)] = row[col]
-            
-            all_items.append(item_data)
+        items = drop_empty_rows(df).rename(columns=str)
+        if not items.empty:
+            frames[source] = items
     
-    if all_items:
-        items_df = pd.DataFrame(all_items)
+    if frames:
+        metadata = ['Table_Source', 'Row_Index']
+        # A table column named like a metadata column keeps its own values;
+        # tables without that column fill it in from the metadata instead
+        clashes = [name for name in metadata if any(name in items.columns for items in frames.values())]
+        for source, items in frames.items():
+            fallback = {'Table_Source': source, 'Row_Index': items.index}
+            missing = {name: fallback[name] for name in clashes if name not in items.columns}
+            if missing:
+                frames[source] = items.assign(**missing)
+
+        # The table source and original row index become the leading columns
+        items_df = pd.concat(frames, names=metadata, sort=False)
+        if clashes:
+            items_df = items_df.reset_index(level=[name for name in metadata if name not in clashes])
+            items_df = items_df[metadata + items_df.columns.drop(metadata).tolist()].reset_index(drop=True)
+        else:
+            items_df = items_df.reset_index()
         # Remove rows that are mostly empty
         items_df = items_df.dropna(thresh=len(items_df.columns) * 0.3)
-        return items_df
+        return downcast_columns(items_df)
     else:
         return pd.DataFrame()
 
@@ -155,23 +185,32 @@ def calculate_summary_stats(items_df):
     total_products = len(items_df)
     total_quantity = 0
     
-    # Try to find quantity columns and sum them
-    for col in items_df.columns:
-        col_str = str(col).lower()
-        if any(keyword in col_str for keyword in ['qty', 'quantity', 'units', 'count', 'qnty']):
-            try:
-                # Clean and convert to numeric
-                numeric_values = pd.to_numeric(
-                    items_df[col].astype(str).str.replace(r'[^\d.]', '', regex=True), 
-                    errors='coerce'
-                )
-                total_quantity += numeric_values.sum()
-                break
-            except:
-                continue
+    # Sum the first column whose name looks like a quantity
+    qty_cols = items_df.columns[items_df.columns.astype(str).str.contains(_QTY_COLUMN_RE)]
+    if len(qty_cols) > 0:
+        # Clean and convert to numeric
+        numeric_values = pd.to_numeric(
+            items_df[qty_cols[0]].astype(str).str.replace(_NON_NUMERIC_RE, '', regex=True), 
+            errors='coerce'
+        )
+        total_quantity = numeric_values.sum()
     
     return total_products, int(total_quantity) if total_quantity > 0 else "Unable to calculate"
 
+@st.cache_data(max_entries=16)
+def convert_to_csv(df):
+    """Convert a DataFrame to CSV text for the download buttons"""
+    return df.to_csv(index=False)
+
+@st.cache_data(max_entries=16)
+def create_excel_report(summary_df, items_df):
+    """Build the combined Excel report once per distinct summary and line items"""
+    excel_buffer = BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+        summary_df.to_excel(writer, sheet_name='Order_Summary', index=False)
+        items_df.to_excel(writer, sheet_name='Line_Items', index=False)
+    return excel_buffer.getvalue()
+
 def main():
     st.title("📋 Order PDF Processor")
     st.markdown("Extract order summaries and line items from PDF files using pdfplumber")
@@ -184,150 +223,137 @@ def main():
     )
     
     if uploaded_file is not None:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
+        st.success(f"✅ File uploaded: {uploaded_file.name}")
         
-        try:
-            st.success(f"✅ File uploaded: {uploaded_file.name}")
-            
-            # Extraction options
-            st.sidebar.header("⚙️ Extraction Options")
-            
-            extract_all_pages = st.sidebar.checkbox(
-                "Extract from all pages", 
-                value=True,
-                help="Uncheck to process only the first page"
-            )
-            
-            show_debug = st.sidebar.checkbox(
-                "Show debug information", 
-                value=False,
-                help="Display raw extracted text and tables for debugging"
-            )
-            
-            # Process PDF button
-            if st.button("🚀 Process Order PDF", type="primary"):
-                with st.spinner("Processing order PDF..."):
-                    try:
-                        # Extract tables and text from PDF
-                        tables, full_text = extract_tables_from_pdf(tmp_file_path)
-                        
-                        if show_debug:
-                            with st.expander("🔍 Debug: Raw Extracted Text"):
-                                st.text_area("Full PDF Text", full_text, height=200)
-                        
-                        # Extract customer information from text
-                        customer_name, order_date = extract_customer_info(full_text)
-                        
-                        # Process line items
-                        items_df = process_line_items(tables)
+        # Extraction options
+        st.sidebar.header("⚙️ Extraction Options")
+        
+        extract_all_pages = st.sidebar.checkbox(
+            "Extract from all pages", 
+            value=True,
+            help="Uncheck to process only the first page"
+        )
+        
+        show_debug = st.sidebar.checkbox(
+            "Show debug information", 
+            value=False,
+            help="Display raw extracted text and tables for debugging"
+        )
+        
+        # Process PDF button
+        if st.button("🚀 Process Order PDF", type="primary"):
+            with st.spinner("Processing order PDF..."):
+                try:
+                    # Extract tables and text from PDF
+                    tables, full_text = extract_tables_from_pdf(uploaded_file.getvalue(), extract_all_pages)
+                    
+                    if show_debug:
+                        with st.expander("🔍 Debug: Raw Extracted Text"):
+                            # Cap what is sent to the browser for very long documents
+                            st.text_area("Full PDF Text", full_text[:100_000], height=200)
+                            if len(full_text) > 100_000:
+                                st.caption(f"Showing the first 100,000 of {len(full_text):,} characters")
+                    
+                    # Extract customer information from text
+                    customer_name, order_date = extract_customer_info(full_text)
+                    
+                    # Process line items
+                    items_df = process_line_items(tables)
+                    
+                    # Calculate summary stats
+                    total_products, total_quantity = calculate_summary_stats(items_df)
+                    
+                    # Display Order Summary
+                    st.header("📊 Order Summary")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("👤 Customer Name", customer_name)
+                        st.metric("📅 Order Date", order_date)
+                    
+                    with col2:
+                        st.metric("📦 Total Products Ordered", total_products)
+                        st.metric("🔢 Total Quantity Ordered", total_quantity)
+                    
+                    # Create summary dataframe for download
+                    summary_data = {
+                        'Customer Name': [customer_name],
+                        'Date': [order_date],
+                        'Total Products Ordered': [total_products],
+                        'Total Quantity Ordered': [total_quantity]
+                    }
+                    summary_df = pd.DataFrame(summary_data)
+                    
+                    st.divider()
+                    
+                    # Display Line Items
+                    st.header("📋 Order Line Items")
+                    
+                    if not items_df.empty:
+                        st.dataframe(items_df, use_container_width=True)
                         
-                        # Calculate summary stats
-                        total_products, total_quantity = calculate_summary_stats(items_df)
+                        # Download section
+                        st.divider()
+                        st.header("📥 Download Options")
                         
-                        # Display Order Summary
-                        st.header("📊 Order Summary")
+                        col1, col2, col3 = st.columns(3)
                         
-                        col1, col2 = st.columns(2)
                         with col1:
-                            st.metric("👤 Customer Name", customer_name)
-                            st.metric("📅 Order Date", order_date)
+                            # Download summary as CSV
+                            summary_csv = convert_to_csv(summary_df)
+                            st.download_button(
+                                label="📊 Download Summary (CSV)",
+                                data=summary_csv,
+                                file_name=f"order_summary_{uploaded_file.name.replace('.pdf', '')}.csv",
+                                mime="text/csv"
+                            )
                         
                         with col2:
-                            st.metric("📦 Total Products Ordered", total_products)
-                            st.metric("🔢 Total Quantity Ordered", total_quantity)
-                        
-                        # Create summary dataframe for download
-                        summary_data = {
-                            'Customer Name': [customer_name],
-                            'Date': [order_date],
-                            'Total Products Ordered': [total_products],
-                            'Total Quantity Ordered': [total_quantity]
-                        }
-                        summary_df = pd.DataFrame(summary_data)
-                        
-                        st.divider()
-                        
-                        # Display Line Items
-                        st.header("📋 Order Line Items")
+                            # Download line items as CSV
+                            items_csv = convert_to_csv(items_df)
+                            st.download_button(
+                                label="📋 Download Line Items (CSV)",
+                                data=items_csv,
+                                file_name=f"line_items_{uploaded_file.name.replace('.pdf', '')}.csv",
+                                mime="text/csv"
+                            )
                         
-                        if not items_df.empty:
-                            st.dataframe(items_df, use_container_width=True)
-                            
-                            # Download section
-                            st.divider()
-                            st.header("📥 Download Options")
-                            
-                            col1, col2, col3 = st.columns(3)
-                            
-                            with col1:
-                                # Download summary as CSV
-                                summary_csv = summary_df.to_csv(index=False)
-                                st.download_button(
-                                    label="📊 Download Summary (CSV)",
-                                    data=summary_csv,
-                                    file_name=f"order_summary_{uploaded_file.name.replace('.pdf', '')}.csv",
-                                    mime="text/csv"
-                                )
-                            
-                            with col2:
-                                # Download line items as CSV
-                                items_csv = items_df.to_csv(index=False)
-                                st.download_button(
-                                    label="📋 Download Line Items (CSV)",
-                                    data=items_csv,
-                                    file_name=f"line_items_{uploaded_file.name.replace('.pdf', '')}.csv",
-                                    mime="text/csv"
-                                )
-                            
-                            with col3:
-                                # Download combined Excel file
-                                excel_buffer = BytesIO()
-                                with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                                    summary_df.to_excel(writer, sheet_name='Order_Summary', index=False)
-                                    items_df.to_excel(writer, sheet_name='Line_Items', index=False)
-                                
-                                st.download_button(
-                                    label="📊 Download Complete Report (Excel)",
-                                    data=excel_buffer.getvalue(),
-                                    file_name=f"order_report_{uploaded_file.name.replace('.pdf', '')}.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                )
-                        
-                        else:
-                            st.warning("⚠️ No line items found. The PDF structure might not contain recognizable tables.")
-                            
-                            # Show raw extracted tables for debugging
-                            if tables:
-                                with st.expander("🔍 View Raw Extracted Tables"):
-                                    for i, df in enumerate(tables):
-                                        st.subheader(f"Raw Table {i+1}")
-                                        st.dataframe(df)
-                            else:
-                                st.info("💡 No tables were detected in the PDF. This might be a text-only document or the tables might be formatted as images.")
+                        with col3:
+                            # Download combined Excel file
+                            st.download_button(
+                                label="📊 Download Complete Report (Excel)",
+                                data=create_excel_report(summary_df, items_df),
+                                file_name=f"order_report_{uploaded_file.name.replace('.pdf', '')}.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            )
+                    
+                    else:
+                        st.warning("⚠️ No line items found. The PDF structure might not contain recognizable tables.")
                         
-                        if show_debug and tables:
-                            with st.expander("🔍 Debug: All Extracted Tables"):
-                                for i, df in enumerate(tables):
-                                    st.subheader(f"Table {i+1}")
+                        # Show raw extracted tables for debugging
+                        if tables:
+                            with st.expander("🔍 View Raw Extracted Tables"):
+                                for i, (source, df) in enumerate(tables):
+                                    st.subheader(f"Raw Table {i+1} ({source})")
                                     st.dataframe(df)
+                        else:
+                            st.info("💡 No tables were detected in the PDF. This might be a text-only document or the tables might be formatted as images.")
                     
-                    except Exception as e:
-                        st.error(f"❌ Error processing PDF: {str(e)}")
-                        st.info("💡 Tips:")
-                        st.markdown("""
-                        - Ensure the PDF contains actual tables (not images of tables)
-                        - Check if the PDF is text-based and not scanned
-                        - Try enabling debug mode to see what was extracted
-                        - Some PDFs may have complex layouts that are difficult to parse
-                        """)
-        
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+                    if show_debug and tables:
+                        with st.expander("🔍 Debug: All Extracted Tables"):
+                            for i, (source, df) in enumerate(tables):
+                                st.subheader(f"Table {i+1} ({source})")
+                                st.dataframe(df)
+                
+                except Exception as e:
+                    st.error(f"❌ Error processing PDF: {str(e)}")
+                    st.info("💡 Tips:")
+                    st.markdown("""
+                    - Ensure the PDF contains actual tables (not images of tables)
+                    - Check if the PDF is text-based and not scanned
+                    - Try enabling debug mode to see what was extracted
+                    - Some PDFs may have complex layouts that are difficult to parse
+                    """)
     
     else:
         st.info("👆 Please upload an order PDF file to get started")